@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+#
+#Destination Earth: Energy Offshore application - compute functions
+#Author: Aleksi Nummelin, Andrew Twelves, Jonni Lehtiranta
+#Version: 0.3.0
+#
+# Only numpy and xarray are needed here so that the module stays light
+# to import, e.g. on dask workers and on nodes without a plotting stack.
+
+### --- Libraries --- ### 
+import numpy as np
+import xarray as xr
+from datetime import datetime,timedelta
+import glob
+import os
+import warnings
+import tempfile
+import shutil
+import time as timer
+
+def preprocess(ds):
+    '''
+    Preprocess a dataset checking for variable 'valid_time' and drop it if found
+    
+    Input:
+    ------
+    ds: xarray.Dataset
+    
+    Output:
+    -------
+    ds: xarray.Dataset without the variable 'valid_time'
+    '''
+    if 'valid_time' in list(ds.variables):
+        return ds.drop_vars(['valid_time'])
+    else:
+        return ds
+
+def find_files(config,var):
+    '''
+    Find the monthly daily exceedance files of a given variable
+
+    Input:
+    ------
+    config: dict, loaded from the configuration.yml file and including
+            the path to the exceedance files under the key 'opa_path'
+            and the range of years under the key 'years'.
+    var:    str, name of the variable e.g. '10ws'
+
+    Output:
+    -------
+    flist: list of file names in time order. Missing files are reported and skipped.
+    '''
+    year0=config['years'][0]
+    year1=config['years'][1]
+    flist=[]
+    for year in range(year0,year1+1):
+        for month in range(1,13):
+            fname = glob.glob(config['opa_path']+str(year)+'_'+str(month).zfill(2)+ \
+                              '_??_to_'+str(year)+'_'+str(month).zfill(2)+'_??_'+var+'*_daily_thresh_exceed.nc')
+            if len(fname)==0:
+                print('file '+config['opa_path']+str(year)+'_'+str(month).zfill(2)+ \
+                      '_??_to_'+str(year)+'_'+str(month).zfill(2)+'_??_'+var+'*_daily_thresh_exceed.nc' + ' not found')
+            else:
+                flist.append(fname[0])
+    return flist
+
+def load_data(config):
+    '''
+    Load data give the config dictionary
+
+    Input:
+    ------
+    config: dict, loaded from the configuration.yml file and including
+            the names of the desired variables under the key {'var_exceed'} 
+            and their desired exceedance values.  
+    
+    Output:
+    -------
+    data: dict of xr.DataArrays (time,lat,lon). The xr.DataArrays are the daily exceedance
+          statistics of a given variable (1-24 if based on hourly data, 0-1 if based on daily data).
+          The dict entries are names like 'var_name_exceed_limit' e.g. ws10_exceed_21 for 10 m wind
+          exceeding 21 m/s.
+    '''
+    var_exceed = config['var_exceed']
+    #
+    data={}
+    for var in var_exceed.keys():
+        print(var)
+        flist = find_files(config,var)
+        dum = xr.open_mfdataset(flist,combine='nested',
+                                concat_dim='time',preprocess=preprocess,engine='netcdf4')
+        for limit in var_exceed[var]['limits']:
+            #print(var)
+            data[var+'_exceed'+limit] = dum.sel(thresholds=float(limit)).squeeze().rename({var:var+'_exceed'+limit})
+            #if 'date' in list(data[var+'_exceed'+limit].coords):
+            #    print(var+'_exceed'+limit)
+            #    data[var+'_exceed'+limit]=data[var+'_exceed'+limit].rename({'date':'time'})
+    return data
+
+def compute_weather_windows(suitable_conditions,windows=[3,5,7]):
+    '''
+    Determine how likely it is that in a given month
+    one will find a weather window (user defined criteria)
+
+    Input:
+    ----------
+    suitable_conditions: xr.DataArray [time,lat,lon], mask [0 or 1]
+                         of suitable conditions that match user 
+                         defined criteria (float)
+    windows: list or numpy.array (default=[3,5,7]), weather window lengths in days (int)
+    
+    Output:
+    ----------
+    weather_window: xarray.DataArray (month,lat,lon,window), mean monthly likelihood [0-1]
+                    of being within the user defined criteria (i.e. not exceeding the criteria) 
+    '''
+    for w,window in enumerate(windows):
+        # returns 1 if conditions are suitable throughout the time period
+        weather_window = suitable_conditions.rolling(time=window,center=True).mean()
+        if w==0:
+            # return the mean i.e.
+            # 'fraction of days (time) in a month' during which there
+            # is a weather window corresponding to the given conditions
+            # 
+            weather_windows=weather_window.where(weather_window==1).fillna(0).\
+                groupby('time.month').mean().expand_dims(dim='windows')
+        else:
+            dum = weather_window.where(weather_window==1).fillna(0).\
+                groupby('time.month').mean().expand_dims(dim='windows')
+            weather_windows = xr.concat([weather_windows, dum],dim='windows')
+    #
+    return weather_windows.assign_coords({'windows':windows})
+
+def compute_yearly_monthly_means(var):
+    '''
+    Calculate the mean of each month of each year
+
+    Input:
+    ------
+    var:   xr.DataArray (time, lat, lon), timeseries of data at any sub-monthly frequency.
+
+    Output:
+    -------
+    means: xr.DataArray (month,year,lat,lon), monthly means of each year. Months that
+           are missing from a given year are NaN.
+    '''
+    # define which indices belong to which month
+    month_groups=var.groupby('time.month').groups
+    means = xr.concat([var.isel(time=month_groups[month]).groupby('time.year').mean().expand_dims({'month':[month]})
+                       for month in sorted(month_groups.keys())],dim='month',join='outer')
+    # quantiles and resampling over years need the full year dimension in one chunk
+    if means.chunks is not None:
+        means = means.chunk({'month':-1,'year':-1})
+    return means
+
+def compute_extreme_climatology(var=None,quantiles=[0.05,0.5,0.95],yearly_monthly_means=None):
+    '''
+    Calculate interannual extemes for each month assuming
+    that input array is monthly data
+
+    Input:
+    ------
+    var:       xr.DataArray (time, lat, lon) (default=None), timeseries of data at any sub-monthly frequency.
+               Needed only if yearly_monthly_means is not given.
+    quantiles: List or Array (default=[0.05,0.5,0.95]), specifying the quantiles of interannual variability [0-1]
+    yearly_monthly_means: xr.DataArray (month,year,lat,lon) (default=None), output of compute_yearly_monthly_means.
+                          If given, var is not used and the means are not computed again.
+    
+    Output:
+    -------
+    var_out:   xarray.DataArray (month,lat,lon,quantile), output climatology with quantiles specifying the range of interannual variability
+    '''
+    if yearly_monthly_means is None:
+        if var is None:
+            raise ValueError('either var or yearly_monthly_means needs to be given')
+        yearly_monthly_means = compute_yearly_monthly_means(var)
+    # interannual variability of the monthly means
+    return yearly_monthly_means.quantile(quantiles,dim='year').transpose('month','quantile',...)
+
+def _bootstrap_indices(n_year,n_bootstrap=1000,seed=0):
+    '''
+    Draw the years of each bootstrap replicate (with replacement)
+
+    Input:
+    ------
+    n_year:      int, number of years
+    n_bootstrap: int (default=1000), number of bootstrap replicates
+    seed:        int (default=0), seed of the random number generator
+
+    Output:
+    -------
+    idx: numpy.array (n_bootstrap,n_year), year indices of each replicate
+    '''
+    return np.random.default_rng(seed).integers(0,n_year,size=(n_bootstrap,n_year))
+
+def _nanquantile(var,quantiles,axis=-1):
+    '''
+    Vectorized NaN-aware quantiles with linear interpolation (same as np.nanquantile).
+    np.nanquantile loops over every point along the other axes, so here the quantiles
+    are interpolated from the sorted values instead (NaNs are sorted last). This is
+    also faster than np.quantile for the small year axis of the bootstrap samples.
+
+    Input:
+    ------
+    var:       numpy.array
+    quantiles: List or Array, quantiles [0-1]
+    axis:      int (default=-1), axis along which the quantiles are computed
+
+    Output:
+    -------
+    out: numpy.array (quantile,...), NaN where all the values along axis are NaN
+    '''
+    var = np.sort(np.moveaxis(var,axis,-1),axis=-1)
+    n   = np.sum(~np.isnan(var),axis=-1)
+    pos = np.asarray(quantiles,dtype='float64').reshape((-1,)+(1,)*n.ndim)*(n-1)
+    lo  = np.clip(np.floor(pos),0,None).astype('int64')
+    hi  = np.clip(np.ceil(pos),0,None).astype('int64')
+    vlo = np.take_along_axis(var[None],lo[...,None],axis=-1)[...,0]
+    vhi = np.take_along_axis(var[None],hi[...,None],axis=-1)[...,0]
+    return np.where(n>0,vlo+(pos-lo)*(vhi-vlo),np.nan)
+
+def _bootstrap_statistics(means,idx,quantiles,confidence,batch_size=100):
+    '''
+    Bootstrap confidence intervals of the interannual quantiles and the mean
+    of yearly monthly means. The replicates are processed in batches along a
+    replicate axis, one month at a time, to bound the memory use.
+
+    Input:
+    ------
+    means:      numpy.array (...,month,year), yearly monthly means
+    idx:        numpy.array (n_bootstrap,year), see _bootstrap_indices
+    quantiles:  List or Array, quantiles of interannual variability [0-1]
+    confidence: List or Array, quantiles of the bootstrap distribution defining the confidence interval [0-1]
+    batch_size: int (default=100), number of replicates processed at once
+
+    Output:
+    -------
+    out: numpy.array (...,month,confidence,statistic), the statistics are the quantiles followed by the mean
+    '''
+    n_bootstrap = idx.shape[0]
+    n_stat      = len(quantiles)+1
+    out = np.full(means.shape[:-1]+(len(confidence),n_stat),np.nan,dtype='float32')
+    with warnings.catch_warnings():
+        # all-NaN points (e.g. land) are expected
+        warnings.simplefilter('ignore',category=RuntimeWarning)
+        for m in range(means.shape[-2]):
+            stats = np.empty((n_bootstrap,n_stat)+means.shape[:-2],dtype='float32')
+            for b0 in range(0,n_bootstrap,batch_size):
+                # (...,batch,year) -> (batch,...,year)
+                sample = np.moveaxis(means[...,m,:][...,idx[b0:b0+batch_size]],-2,0)
+                stats[b0:b0+batch_size,:-1] = np.moveaxis(_nanquantile(sample,quantiles,axis=-1),0,1)
+                stats[b0:b0+batch_size,-1]  = np.nanmean(sample,axis=-1)
+            out[...,m,:,:] = np.moveaxis(_nanquantile(stats,confidence,axis=0),[0,1],[-2,-1])
+    return out
+
+def compute_bootstrap_confidence_intervals(yearly_monthly_means,quantiles=[0.05,0.5,0.95],confidence=[0.05,0.95],
+                                           n_bootstrap=1000,seed=0,batch_size=100):
+    '''
+    Calculate bootstrap confidence intervals of the extreme climatology (interannual quantiles)
+    and of the mean climatology by resampling the years with replacement. Only the already
+    reduced yearly monthly means are resampled, so the daily data is not read again.
+
+    Input:
+    ------
+    yearly_monthly_means: xr.DataArray (month,year,lat,lon), output of compute_yearly_monthly_means
+    quantiles:   List or Array (default=[0.05,0.5,0.95]), specifying the quantiles of interannual variability [0-1]
+    confidence:  List or Array (default=[0.05,0.95]), quantiles of the bootstrap distribution, i.e. the default
+                 gives the 90% confidence interval [0-1]
+    n_bootstrap: int (default=1000), number of bootstrap replicates
+    seed:        int (default=0), seed of the random number generator. The same resampled years are
+                 used at every grid point.
+    batch_size:  int (default=100), number of replicates processed at once
+
+    Output:
+    -------
+    ci: xr.Dataset including
+        quantile_ci: xr.DataArray (month,quantile,confidence,lat,lon), confidence intervals of the extreme climatology
+        mean_ci:     xr.DataArray (month,confidence,lat,lon), confidence intervals of the mean climatology
+    '''
+    idx = _bootstrap_indices(yearly_monthly_means.year.size,n_bootstrap=n_bootstrap,seed=seed)
+    out = xr.apply_ufunc(_bootstrap_statistics,yearly_monthly_means,
+                         kwargs={'idx':idx,'quantiles':quantiles,'confidence':confidence,'batch_size':batch_size},
+                         input_core_dims=[['month','year']],output_core_dims=[['month','confidence','statistic']],
+                         dask='parallelized',output_dtypes=['float32'],
+                         dask_gufunc_kwargs={'output_sizes':{'confidence':len(confidence),'statistic':len(quantiles)+1}})
+    out = out.assign_coords({'confidence':confidence})
+    ci  = xr.Dataset({'quantile_ci':out.isel(statistic=slice(0,len(quantiles))).rename({'statistic':'quantile'}).\
+                          assign_coords({'quantile':quantiles}).transpose('month','quantile','confidence',...),
+                      'mean_ci':out.isel(statistic=-1,drop=True).transpose('month','confidence',...)})
+    return ci
+
+def compute_climatologies(data,config,spatial_chunks={'lat':60,'lon':60},quantiles=[0.05,0.5,0.95],windows=[3,5,7],allowed_exceedance=0,
+                          compute_ww=True, compute_climatology=True, compute_eclimatology=True,
+                          n_bootstrap=0, confidence=[0.05,0.95], seed=0):
+    '''
+    Compute monthly climatologies and save them to netcdf files.
+    
+    Input:
+    ------
+    config: dict, loaded from the configuration.yml file and including
+            the names of the desired variables under the key {'var_exceed'}
+            and their desired exceedance values. Climatological output 
+            will be saved under the directory defined by 'data_path' key.
+            
+    data: dict of xr.DataArrays (time,lat,lon). The xr.DataArrays are the daily exceedance
+          statistics of a given variable (1-24 if based on hourly data, 0-1 if based on daily data).
+          The dict entries are names like 'var_name_exceed_limit' e.g. ws10_exceed_21 for 10 m wind
+          exceeding 21 m/s.
+    spatial_chunks: dict, default is {'lat':60,'lon':60}. In order to compute weather windows and extreme
+                    climatologies, we need to have a continuous chunk on time dimension. Therefore, it is
+                    likely desirable to chunk the spatial dimensions in order to avoid very large memory
+                    consumption.
+    quantiles: List or Array (default=[0.05,0.5,0.95]), specifying the quantiles of interannual variability [0-1]
+               Passed directly to compute_extreme_climatology function
+    windows: list or numpy.array (default=[3,5,7]), weather window lengths in days (int). Passed directly to
+             compute_weather_windows function.
+    allowed_exceedance: int (default=0), for daily data this needs to be 0, 
+                        but for hourly data this can be set between 0 (no exceedance allowed) 
+                        to 23 (23 hours exceedance allowed).
+    compute_ww:           boolean (default=True), whether or not to compute weather windows
+    compute_climatology:  boolean (default=True), whether or not to compute exceedance climatology
+    compute_eclimatology: boolean (default=True), whether or not to compute the interannual extremes of the exceedance climatology.
+                          It only makes sense to compute this if more than one year is considered at once.
+    n_bootstrap: int (default=0), number of bootstrap replicates over years. If larger than 0, confidence intervals
+                 of the extreme climatology and of the mean climatology are saved to the extreme climatology file
+                 as variables combination+'_quantile_ci' and combination+'_mean_ci'. Requires compute_eclimatology.
+    confidence:  List or Array (default=[0.05,0.95]), bounds of the bootstrap confidence interval [0-1].
+                 Passed directly to compute_bootstrap_confidence_intervals function.
+    seed:        int (default=0), seed of the bootstrap resampling, fixed for reproducibility.
+
+    Output:
+    -------
+    
+    out_names: This function saves monthly statistics to annual files and returns the files paths as a dictionary. 
+               The output directory is defined in configuration yml file by the 'data_path' key.
+    
+    '''
+    threshold_combination = config['threshold_combination']
+    #
+    suitable_conditions={}
+    out_names={}
+    for combination in threshold_combination.keys():
+        print(combination)
+        for v,var in enumerate(threshold_combination[combination]):
+            dum = data[var][var]
+            # The exceedance data is allowed to be between 0-24, but assumed to have daily frequency.
+            # Here any exceedance triggers the day not to be within the 'suitable conditions' (<1 condition)
+            # Later on, this this could be changed such that one can allow for e.g. 4 hours a day to exceed a limit
+            # by changing the condition to dum<4.
+            dum = (1-dum.where(dum<(allowed_exceedance+1)).fillna(1)).astype(bool)
+            if v==0:
+                suitable_conditions[combination] = dum
+            else:
+                suitable_conditions[combination] = (suitable_conditions[combination] & dum)
+        # calculate and save the climatology of weather windows given the 'suitable conditions' mask
+        years_str = str(config['years'][0])+'_'+str(config['years'][1])
+        out_list = []
+        if compute_ww:
+            print('weather windows')
+            weather_window=compute_weather_windows(suitable_conditions[combination].astype('float32').chunk({'time':-1}).chunk(spatial_chunks),windows=windows)
+            weather_window.to_dataset(name=combination).\
+                to_netcdf(config['data_path']+combination+'_weather_windows_years_'+years_str+'.nc')
+            #
+            out_list.append(config['data_path']+combination+'_weather_windows_years_'+years_str+'.nc')
+        # calculate and save the climatology of the suitable conditions (frequency)
+        if compute_climatology:
+            print('climatology')
+            suitable_climatology=suitable_conditions[combination].astype('float32').groupby('time.month').mean().chunk(spatial_chunks)
+            suitable_climatology.to_dataset(name=combination).\
+                to_netcdf(config['data_path']+combination+'_climatology_years_'+years_str+'.nc')
+            #
+            out_list.append(config['data_path']+combination+'_climatology_years_'+years_str+'.nc')
+        # calculate and save the extreme (interannual) climatology of suitable weather windows (frequency during worse/median/best year)
+        if compute_eclimatology:
+            print('extreme climatology')
+            yearly_monthly_means = compute_yearly_monthly_means(suitable_conditions[combination].astype('float32').chunk({'time':-1}).chunk(spatial_chunks))
+            suitable_extreme_climatology = compute_extreme_climatology(quantiles=quantiles,yearly_monthly_means=yearly_monthly_means).\
+                to_dataset(name=combination)
+            if n_bootstrap>0:
+                print('bootstrap confidence intervals')
+                ci = compute_bootstrap_confidence_intervals(yearly_monthly_means,quantiles=quantiles,confidence=confidence,
+                                                            n_bootstrap=n_bootstrap,seed=seed)
+                suitable_extreme_climatology[combination+'_quantile_ci'] = ci.quantile_ci
+                suitable_extreme_climatology[combination+'_mean_ci']     = ci.mean_ci
+            suitable_extreme_climatology.to_netcdf(config['data_path']+combination+'_extreme_climatology_years_'+years_str+'.nc')
+            #
+            out_list.append(config['data_path']+combination+'_extreme_climatology_years_'+years_str+'.nc')
+        #
+        out_names[combination]=out_list
+        
+    return out_names
+
+def test():
+    '''
+    Test the different functions with dummy data
+    '''
+    time       = np.arange(datetime(2001,1,1), datetime(2002,1,1), timedelta(days=1)).astype(datetime)
+    nx         = time.size
+    dum1       = xr.DataArray(np.zeros(nx),dims='time').assign_coords({'time':time})
+    dum2       = xr.DataArray(np.zeros(nx),dims='time').assign_coords({'time':time})
+    dum1[:31]  = 1
+    dum2[:59]  = 2
+    out_correct={}
+    threshold_combination = {'th1':['dum1_exceed1'],'th2':['dum2_exceed2'],'combined':['dum1_exceed1','dum2_exceed2']}
+    out_correct={'th1':[0,0,0],'th2':[0,0,0],'combined':[0,0,0]}
+    # climatology
+    config={}
+    data={}
+    config['years']=[2001,2001]
+    config['data_path']=''
+    config['threshold_combination']=threshold_combination
+    data['dum1_exceed1']=dum1.to_dataset(name='dum1_exceed1')
+    data['dum2_exceed2']=dum2.to_dataset(name='dum2_exceed2')
+    out_names = compute_climatologies(data,config,spatial_chunks={})
+    print('Checking output...')
+    for combination in out_names.keys():
+        print(combination)
+        out = xr.open_dataset(out_names[combination][0])
+        try:
+            assert out[combination].isel(windows=0).values[0]==out_correct[combination][0], f'non-expected value for {combination}'
+        except AssertionError:
+            print('non-expected value for '+combination+' weather windows')
+        else:
+            print(combination+' weather windows as expected')
+        #
+        out.close()
+        os.remove(out_names[combination][0])
+        #
+        out = xr.open_dataset(out_names[combination][1])
+        try:
+            assert out[combination].values[0]==out_correct[combination][1], f'non-expected value for {combination}'
+        except AssertionError:
+            print('non-expected value for '+combination + ' climatologies.')
+        else:
+            print(combination+' climatologies as expected')
+        #
+        out.close()
+        os.remove(out_names[combination][1])
+        #
+        out = xr.open_dataset(out_names[combination][2])
+        try:
+            assert out[combination].isel(quantile=1).values[0]==out_correct[combination][2], f'non-expected value for {combination}'
+        except AssertionError:
+            print('non-expected value for '+combination + ' climatological extremens.')
+        else:
+            print(combination+' climatological extremes as expected')
+        #
+        out.close()
+        os.remove(out_names[combination][2])
+    #
+    _test_engines()
+    _test_bootstrap()
+
+def _write_test_exceedance_files(path,years=[2001,2003],missing=[(2002,3)],nlat=12,nlon=10,seed=0):
+    '''
+    Write dummy monthly exceedance files like the ones produced by the preprocessing script.
+    Two variables are written: 'ws' (0-24 hours, thresholds 10 and 18) and 'ice' (0-1, threshold 0.05,
+    with missing values on 'land'). The (year,month) pairs in missing are not written.
+    '''
+    rng  = np.random.default_rng(seed)
+    lat  = np.linspace(55,66,nlat)
+    lon  = np.linspace(10,28,nlon)
+    land = rng.random((nlat,nlon))<0.1
+    for year in range(years[0],years[1]+1):
+        for month in range(1,13):
+            if (year,month) in missing:
+                continue
+            time  = np.arange(datetime(year,month,1),datetime(year+month//12,month%12+1,1),timedelta(days=1)).astype('datetime64[ns]')
+            dates = str(year)+'_'+str(month).zfill(2)+'_01_to_'+str(year)+'_'+str(month).zfill(2)+'_'+str(time.size).zfill(2)
+            coords = {'time':time,'lat':lat,'lon':lon}
+            # mostly calm days so that weather windows exist
+            ws = rng.choice([0,0,0,0,0,1,5,12],size=(2,time.size,nlat,nlon)).astype('float32')
+            xr.DataArray(ws,dims=('thresholds','time','lat','lon'),coords=dict(coords,thresholds=[10.0,18.0])).\
+                to_dataset(name='ws').to_netcdf(path+dates+'_ws_timestep_60_daily_thresh_exceed.nc')
+            ice = (rng.random((1,time.size,nlat,nlon))<0.2).astype('float32')
+            ice[:,:,land] = np.nan
+            xr.DataArray(ice,dims=('thresholds','time','lat','lon'),coords=dict(coords,thresholds=[0.05])).\
+                to_dataset(name='ice').to_netcdf(path+dates+'_ice_timestep_1440_daily_thresh_exceed.nc')
+
+def _test_engines():
+    '''
+    Test that the dask (compute_climatologies) and the tiled numpy (compute_climatologies_tiled)
+    engines produce the same output from the same dummy exceedance files
+    '''
+    from .tiled import compute_climatologies_tiled
+    path = tempfile.mkdtemp()+'/'
+    try:
+        os.makedirs(path+'opa/')
+        os.makedirs(path+'dask/')
+        os.makedirs(path+'tiled/')
+        _write_test_exceedance_files(path+'opa/')
+        config={'opa_path':path+'opa/','years':[2001,2003],
+                'var_exceed':{'ws':{'limits':['10','18']},'ice':{'limits':['0.05']}},
+                'threshold_combination':{'wind':['ws_exceed10'],'wind_and_ice':['ws_exceed18','ice_exceed0.05']}}
+        # even window length included
+        windows=[2,3,4]
+        t0 = timer.time()
+        out_dask = compute_climatologies(load_data(dict(config,data_path=path+'dask/')),dict(config,data_path=path+'dask/'),
+                                         spatial_chunks={'lat':5,'lon':5},windows=windows,n_bootstrap=200,seed=1)
+        t1 = timer.time()
+        out_tiled = compute_climatologies_tiled(dict(config,data_path=path+'tiled/'),tile_size={'lat':5,'lon':4},
+                                                windows=windows,n_threads=2,n_bootstrap=200,seed=1)
+        t2 = timer.time()
+        print('dask engine {:.2f} s, tiled numpy engine {:.2f} s'.format(t1-t0,t2-t1))
+        print('Checking tiled engine against dask engine...')
+        for combination in out_dask.keys():
+            for fdask,ftiled in zip(out_dask[combination],out_tiled[combination]):
+                with xr.open_dataset(fdask) as ddask, xr.open_dataset(ftiled) as dtiled:
+                    for name in ddask.data_vars:
+                        assert dtiled[name].dims==ddask[name].dims, f'non-expected dimensions of {name} in {ftiled}'
+                        np.testing.assert_allclose(dtiled[name].values,ddask[name].values,rtol=1E-5,atol=1E-6,
+                                                   err_msg=f'{name} in {ftiled}')
+            print(combination+' tiled engine as expected')
+        # the exceedance files must not be kept open, run with fewer file descriptors than files
+        try:
+            import resource
+        except ImportError:
+            resource = None
+        if resource is not None:
+            print('Checking tiled engine with a low limit of open files...')
+            n_files = len(glob.glob(path+'opa/*.nc'))
+            soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            limit = 60 if hard==resource.RLIM_INFINITY else min(60,hard)
+            assert n_files>limit, 'not enough dummy files to test the open file limit'
+            os.makedirs(path+'ulimit/')
+            resource.setrlimit(resource.RLIMIT_NOFILE,(limit,hard))
+            try:
+                compute_climatologies_tiled(dict(config,data_path=path+'ulimit/'),tile_size={'lat':5,'lon':4},
+                                            windows=windows,n_threads=2)
+            finally:
+                resource.setrlimit(resource.RLIMIT_NOFILE,(soft,hard))
+            print('tiled engine with '+str(n_files)+' files and a limit of '+str(limit)+' open files as expected')
+    finally:
+        shutil.rmtree(path)
+
+def _test_bootstrap():
+    '''
+    Test the bootstrap confidence intervals with dummy yearly monthly means
+    '''
+    print('Checking bootstrap confidence intervals...')
+    rng   = np.random.default_rng(0)
+    means = xr.DataArray(rng.random((12,10,4,5)).astype('float32'),dims=('month','year','lat','lon'),
+                         coords={'month':np.arange(1,13),'year':np.arange(2001,2011)})
+    # a missing month and a missing point (e.g. land)
+    means[2,3]      = np.nan
+    means[:,:,0,0]  = np.nan
+    # vectorized quantiles are equal to numpy
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore',category=RuntimeWarning)
+        for axis in [0,1,-1]:
+            np.testing.assert_allclose(_nanquantile(means.values,[0.05,0.5,0.95],axis=axis),
+                                       np.nanquantile(means.values,[0.05,0.5,0.95],axis=axis),rtol=1E-6)
+    print('vectorized quantiles as expected')
+    # the same seed gives the same confidence intervals
+    ci1 = compute_bootstrap_confidence_intervals(means,n_bootstrap=500,seed=1,batch_size=64)
+    ci2 = compute_bootstrap_confidence_intervals(means,n_bootstrap=500,seed=1)
+    np.testing.assert_array_equal(ci1.quantile_ci.values,ci2.quantile_ci.values)
+    np.testing.assert_array_equal(ci1.mean_ci.values,ci2.mean_ci.values)
+    print('reproducible confidence intervals as expected')
+    # the point estimates are within the confidence intervals
+    extremes = compute_extreme_climatology(yearly_monthly_means=means)
+    mean     = means.mean('year')
+    valid    = extremes.notnull()
+    assert bool(((ci1.quantile_ci.isel(confidence=0)<=extremes+1E-6) | ~valid).all()), 'quantiles below the confidence interval'
+    assert bool(((ci1.quantile_ci.isel(confidence=-1)>=extremes-1E-6) | ~valid).all()), 'quantiles above the confidence interval'
+    assert bool(((ci1.mean_ci.isel(confidence=0)<=mean+1E-6) & (ci1.mean_ci.isel(confidence=-1)>=mean-1E-6) | mean.isnull()).all()), \
+        'mean outside of the confidence interval'
+    assert bool(ci1.quantile_ci.isel(lat=0,lon=0).isnull().all()), 'non-expected confidence interval at a missing point'
+    print('confidence intervals as expected')
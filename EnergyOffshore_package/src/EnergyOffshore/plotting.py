@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+#
+#Destination Earth: Energy Offshore application - visualization
+#Author: Aleksi Nummelin, Andrew Twelves, Jonni Lehtiranta
+#Version: 0.3.0
+
+### --- Libraries --- ### 
+import numpy as np
+import xarray as xr
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+import matplotlib.path as mpath
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+from matplotlib.colors import from_levels_and_colors
+
+def plot_climatology(climatology,weather_windows,config,
+                     plot_name='DT_climate_threshold_exceedance_with_weather_windows.png',
+                     plot_windows=True,proj=None,extent=None,levels=None):
+    '''
+    Plot the climatological frequencies of 'suitable conditions' on a map with/without weather windows
+    using matplotlib and cartopy.
+    
+    Input:
+    -------
+    climatology:     xr.DataArray [time,lat,lon], mean climatology of a given 'suitable condition'
+    weather_windows: xarray.DataArray (month,lat,lon,window), mean monthly likelihood [0-1]
+                     of being within the user defined criteria (i.e. not exceeding the criteria)
+    plot_name:       str, define the name of the plot (including the path)
+    plot_windows:    boolean, whether to include weather_window contours on the map (default=True)
+    proj:            cartopy map projection (default=None), if not given NearSidePespective centered on
+                     northern Europe will be used.
+    extent:          list or array [lon_min,lon_max,lat_min,lat_max] (default=None), 
+                     if not None will be used to clip the extent of the map (no effect if None)
+    
+    Output:
+    -------
+    Does not return variables, but produces a figure in user defined location (plot_name)
+    '''
+    #
+    if np.any(levels==None):
+        levels=np.arange(0.5,1,0.05)
+    cmap0=plt.get_cmap('viridis')
+    cmlist=[];
+    for cl in np.linspace(0,252,len(levels)+1): cmlist.append(int(cl))
+    cmap2, norm2 = from_levels_and_colors(levels,cmap0(cmlist),extend='both');
+    #
+    RIVERS_50m = cfeature.NaturalEarthFeature('physical','rivers_lake_centerlines', '50m',
+                                          edgecolor=cfeature.COLORS['water'],
+                                          facecolor='none')
+    LAND = cfeature.NaturalEarthFeature('physical', 'land', '10m',edgecolor='None', facecolor='lightgrey', zorder=3)
+    if proj==None:
+        proj = ccrs.NearsidePerspective(central_longitude=15.0, central_latitude=55.0, satellite_height=300E3,
+                                        false_easting=0, false_northing=0, globe=None)
+    #
+    lat = climatology.lat
+    lon = climatology.lon
+    grid = xr.merge([lat.rename({'lat':'y'}),lon.rename({'lon':'x'}),
+                 xr.DataArray(np.arange(lat.min()-0.5*lat.diff('lat').median(),
+                                        lat.max()+lat.diff('lat').median(),
+                                        lat.diff('lat').median()),dims=('y_b')).rename('lat_b'),
+                 xr.DataArray(np.arange(lon.min()-0.5*lon.diff('lon').median(),
+                                        lon.max()+lon.diff('lon').median(),
+                                        lon.diff('lon').median()),dims=('x_b')).rename('lon_b')])
+    #
+    fig,axes = plt.subplots(nrows=4,ncols=3,figsize=(3*5,4*5),subplot_kw={'projection':proj})
+    for a,ax in enumerate(axes.flatten()):
+        ax.set_title('Month:'+str(a+1).zfill(2),fontsize=16)
+        cm1=ax.pcolormesh(grid.lon_b,grid.lat_b, climatology.isel(month=a), #data.avg_tos.squeeze()-273.15,                   
+                      cmap=cmap2,norm=norm2,
+                      transform=ccrs.PlateCarree(),rasterized=True)
+        if plot_windows:
+            for w in range(weather_windows.windows.size):
+                ax.contour(lon,lat,weather_windows.isel(month=a,windows=w),transform=ccrs.PlateCarree(),
+                           colors=['red','k','gray'][w],levels=[0.5],linewidths=0.5)
+        ax.add_feature(RIVERS_50m,zorder=4)
+        ax.add_feature(LAND,zorder=3)
+        ax.coastlines(resolution='10m',color='k',linewidth=0.5)
+        for tarea in config['timeseries_areas'].keys():
+            x0=min(config['timeseries_areas'][tarea]['lon_slice'])
+            y0=min(config['timeseries_areas'][tarea]['lat_slice'])
+            dx=config['timeseries_areas'][tarea]['lon_slice'][1]-config['timeseries_areas'][tarea]['lon_slice'][0]
+            dy=config['timeseries_areas'][tarea]['lat_slice'][1]-config['timeseries_areas'][tarea]['lat_slice'][0]
+            ax.add_patch(mpatches.Rectangle(xy=[x0, y0], width=dx, height=dy,
+                                            facecolor='none', edgecolor='r',
+                                            transform=ccrs.PlateCarree()))
+        if extent!=None:
+            xlim=extent[:2]
+            ylim=extent[2:]
+            rect = mpath.Path([[xlim[0], ylim[0]],
+                   [xlim[1], ylim[0]],
+                   [xlim[1], ylim[1]],
+                   [xlim[0], ylim[1]],
+                   [xlim[0], ylim[0]],
+                   ]).interpolated(20)
+            proj_to_data = ccrs.PlateCarree()._as_mpl_transform(ax) - ax.transData
+            rect_in_target = proj_to_data.transform_path(rect)
+            ax.set_boundary(rect_in_target)
+            #ax.set_extent(extent,crs=ccrs.PlateCarree())
+        
+    cax  = fig.add_axes([0.95,0.15,0.03,0.7])
+    cbar = plt.colorbar(mappable=cm1,cax=cax,orientation='vertical')
+    clab = cbar.ax.set_ylabel(r'Mean fraction of days in a month within a threshold [0-1]',fontsize=22)
+    #
+    fig.subplots_adjust(wspace=0.05,hspace=0.025)
+    fig.savefig(plot_name,dpi=300,transparent=True,
+                bbox_inches='tight',bbox_extra_artists=[clab])
+    plt.close('all')
+
+def plot_climatology_at_location(climatology,extreme_climatology,areas,plot_name):
+    '''
+    Make a climatological plot of given variable at a location. 
+
+    Input:
+    ------
+    climatology: xr.DataArray [time,lat,lon], mean climatology of a given 'suitable condition'
+    extreme_climatology: xr.DataArray [time,lat,lon,quantile], 
+                         interannual extreme climatology of a given 'suitable condition'.
+                         Quantiles are assumed to include [0.05,0.5,0.95].
+    
+    areas: dict, {area: {'name':'long_name_of_the_area'
+                         'lon_slice':[lon_min,lon_max]
+                         'lat_slice':[lat_min,lat_max]
+                 }}
+    plot_name: str, define the name of the plot (including the path)    
+
+    Output:
+    -------
+    
+    Does not return variables, but produces a figure in user defined location (plot_name)
+    '''
+    fig,axes = plt.subplots(sharex=True,sharey=True,nrows=len(areas.keys()),ncols=1,figsize=(10,len(areas.keys())*4))
+    for a, area in enumerate(areas.keys()):
+        if len(areas.keys())>1:
+            ax=axes.flatten()[a]
+        else:
+            ax=axes
+        # define area
+        lon_slice=slice(min(areas[area]['lon_slice']),max(areas[area]['lon_slice']))
+        lat_slice=slice(min(areas[area]['lat_slice']),max(areas[area]['lat_slice']))
+        # weight by cos latitude
+        w = np.cos(np.radians(extreme_climatology.lat.sel(lat=lat_slice)))
+        #
+        ax.set_title(areas[area]['name'],fontsize=16)
+        ax.fill_between(extreme_climatology.month,
+                        (extreme_climatology.sel(quantile=0.05,lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),
+                        (extreme_climatology.sel(quantile=0.95,lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),
+                        color='C1',alpha=0.5)
+        l1,=ax.plot(extreme_climatology.month,
+                    (extreme_climatology.sel(quantile=0.5,lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),label='Median',
+                    color='C1',lw=2)
+        l2,=ax.plot(climatology.month,(climatology.sel(lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),label='Mean',
+                    color='C0',lw=2)
+        ax.set_ylim(0,1)
+        ax.set_xlim(1,12)
+        if a==0:
+            ax.legend(fontsize=16)
+    #
+    ax.set_xlabel('Time [months]',fontsize=18)
+    ylab=fig.text(0.06,0.5,'Fraction of days in a month within a threshold [0-1]',fontsize=18,ha='center',va='center',rotation='vertical')
+    fig.savefig(plot_name,dpi=300,transparent=True,
+                bbox_inches='tight',bbox_extra_artists=[ylab])
+    plt.close('all')
+
+def verify_climatology_at_location(climatologies,extreme_climatologies,areas,plot_name):
+    '''
+    Produce a climatology comparing the model output to reanalysis
+    
+    Input:
+    ------
+    climatologies: dict of xr.DataArray [time,lat,lon], mean climatologies of a given 'suitable condition'.
+                   dict entries are the different conditions for a given model.
+    extreme_climatologies: dict xr.DataArray [time,lat,lon,quantile],
+                         interannual extreme climatology of a given 'suitable condition'.
+                         Quantiles are assumed to include [0.05,0.5,0.95].
+                         dict entries are the different conditions for a given model.
+    areas: dict, {area: {'name':'long_name_of_the_area'
+                         'lon_slice':[lon_min,lon_max]
+                         'lat_slice':[lat_min,lat_max]
+                 }}.
+                 Climatologies will be averaged over these areas.
+    plot_name: str, define the name of the plot (including the path)
+
+    Output:
+    -------
+    Does not return variables, but produces a figure in user defined location (plot_name)
+    '''
+    fig,axes = plt.subplots(sharex=True,sharey=True,nrows=len(areas.keys()),ncols=1,figsize=(10,len(areas.keys())*4))
+    for a, area in enumerate(areas.keys()):
+        if len(areas.keys())>1:
+            ax=axes.flatten()[a]
+        else:
+            ax=axes
+        #
+        lon_slice=slice(min(areas[area]['lon_slice']),max(areas[area]['lon_slice']))
+        lat_slice=slice(min(areas[area]['lat_slice']),max(areas[area]['lat_slice']))
+        #
+        ax.set_title(areas[area]['name'],fontsize=16)
+        for k,key in enumerate(climatologies.keys()):
+            if '10ws_exceed10' in key:
+                threshold='Installation_limit_wind'
+            elif '10ws_exceed18' in key:
+                threshold='Service_limit_high_wind'
+            elif '10ws_exceed21' in key:
+                threshold='Service_limit_storm_wind'
+            if 'IFS' in key:
+                threshold=threshold+' IFS'
+            elif 'CERRA' in key:
+                threshold=threshold+' CERRA'
+            #
+            w = np.cos(np.radians(extreme_climatologies[key].lat.sel(lat=lat_slice)))
+            ax.fill_between(extreme_climatologies[key].month,
+                            (extreme_climatologies[key].sel(quantile=0.05,lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),
+                            (extreme_climatologies[key].sel(quantile=0.95,lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),
+                            color='C'+str(k),alpha=0.4)
+            l1,=ax.plot(extreme_climatologies[key].month,
+                        (extreme_climatologies[key].sel(quantile=0.5,lon=lon_slice,lat=lat_slice).mean('lon')*w).sum('lat')/w.sum('lat'),
+                         label=threshold,
+                        color='C'+str(k),lw=2)
+        #
+        ax.set_ylim(0,1)
+        ax.set_xlim(1,12)
+        if a==0:
+            ax.legend(fontsize=12)
+    #
+    ax.set_xlabel('Time [months]',fontsize=18)
+    ylab=fig.text(0.06,0.5,'Fraction of days in a month within a threshold [0-1]',fontsize=18,ha='center',va='center',rotation='vertical')
+    fig.savefig(plot_name,dpi=300,transparent=True,
+                bbox_inches='tight',bbox_extra_artists=[ylab])
+    plt.close('all')
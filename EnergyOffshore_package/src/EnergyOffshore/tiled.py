@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+#
+#Destination Earth: Energy Offshore application - tiled numpy engine
+#Author: Aleksi Nummelin, Andrew Twelves, Jonni Lehtiranta
+#Version: 0.3.0
+#
+# Alternative to compute_climatologies that does not need dask. The exceedance
+# files are read in spatial tiles (hyperslab reads of the full time axis) and each
+# tile is processed with vectorized numpy in a thread pool. Results are written
+# tile by tile into the same output files as compute_climatologies produces.
+
+### --- Libraries --- ###
+import numpy as np
+import xarray as xr
+import netCDF4
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os
+import threading
+from .compute import find_files, _bootstrap_indices, _bootstrap_statistics
+
+# the netCDF/HDF5 libraries are not thread safe, all reads and writes share this lock
+_NETCDF_LOCK = threading.Lock()
+
+def _scan_exceedance_files(config,variables):
+    '''
+    Scan the exceedance files of the given variables for tile by tile reading and
+    check that all the variables share the same time, lat and lon coordinates.
+    The files are not kept open, they are opened again for each tile read.
+
+    Input:
+    ------
+    config:    dict, see compute_climatologies_tiled
+    variables: list of variable names e.g. ['10ws','avg_siconc']
+
+    Output:
+    -------
+    datasets: dict of lists of (file name, thresholds) tuples, one list per variable
+    time:     xr.DataArray (time), time axis of the concatenated files
+    lat, lon: xr.DataArrays, horizontal coordinates
+    '''
+    datasets={}
+    time=None
+    for var in sorted(variables):
+        datasets[var]=[]
+        var_time=[]
+        for fname in find_files(config,var):
+            # coordinates are decoded with xarray, the data is read later directly with netCDF4
+            with xr.open_dataset(fname,engine='netcdf4') as ds:
+                var_time.append(ds.time.load())
+                if time is None and len(var_time)==1:
+                    lat = ds.lat.load()
+                    lon = ds.lon.load()
+                elif not (ds.lat.size==lat.size and ds.lon.size==lon.size and
+                          np.allclose(ds.lat.values,lat.values) and np.allclose(ds.lon.values,lon.values)):
+                    raise ValueError('lat/lon coordinates of '+fname+' differ from the other exceedance files')
+                thresholds = ds.thresholds.values
+            datasets[var].append((fname,thresholds))
+        var_time = xr.concat(var_time,dim='time')
+        if time is None:
+            time = var_time
+        elif not np.array_equal(var_time.values,time.values):
+            raise ValueError('exceedance files of '+var+' do not have the same time axis as the other variables')
+    return datasets, time, lat, lon
+
+def _read_tile(datasets,var,limits,lat_slice,lon_slice):
+    '''
+    Read the full time series of the given thresholds of an exceedance variable over a spatial tile.
+    Each file is opened and read only once for all the thresholds and closed right after.
+
+    Input:
+    ------
+    datasets:  dict of lists of (file name, thresholds), see _scan_exceedance_files
+    var:       str, name of the variable e.g. '10ws'
+    limits:    list of str, exceedance limits e.g. ['10','18','21']
+    lat_slice: slice, latitude indices of the tile
+    lon_slice: slice, longitude indices of the tile
+
+    Output:
+    -------
+    exceedance: dict, {limit: numpy.array (time,lat,lon)}, float32 with missing values as NaN
+    '''
+    parts=[]
+    for fname,thresholds in datasets[var]:
+        t_idx = []
+        for limit in limits:
+            match = np.flatnonzero(np.isclose(thresholds,float(limit)))
+            if match.size==0:
+                raise ValueError('threshold '+limit+' of '+var+' not found in '+fname)
+            t_idx.append(int(match[0]))
+        read_idx = sorted(set(t_idx))
+        index = {'thresholds':read_idx,'lat':lat_slice,'lon':lon_slice}
+        with _NETCDF_LOCK:
+            with netCDF4.Dataset(fname,'r') as nc:
+                ncvar      = nc.variables[var]
+                dimensions = ncvar.dimensions
+                values     = ncvar[tuple(index.get(dim,slice(None)) for dim in dimensions)]
+        values = np.ma.filled(values.astype('float32'),np.nan)
+        values = np.moveaxis(values,[dimensions.index(dim) for dim in ['thresholds','time','lat','lon']],[0,1,2,3])
+        parts.append(values[[read_idx.index(t) for t in t_idx]])
+    values = np.concatenate(parts,axis=1)
+    return {limit:values[l] for l,limit in enumerate(limits)}
+
+def _suitable_conditions(exceedances,allowed_exceedance=0):
+    '''
+    Combine exceedance arrays to a mask of suitable conditions, see compute_climatologies
+
+    Input:
+    ------
+    exceedances:        list of numpy.arrays (time,lat,lon), daily exceedance statistics
+    allowed_exceedance: int (default=0), see compute_climatologies
+
+    Output:
+    -------
+    suitable: numpy.array (time,lat,lon), boolean mask of suitable conditions
+    '''
+    suitable = None
+    for dum in exceedances:
+        # same condition as in compute_climatologies, missing values are not suitable
+        dum = (1-np.where(dum<(allowed_exceedance+1),dum,1)).astype(bool)
+        if suitable is None:
+            suitable = dum
+        else:
+            suitable = (suitable & dum)
+    return suitable
+
+def _weather_window(suitable,window):
+    '''
+    Mark the days that are in the center of a window of suitable conditions.
+    Equivalent to rolling(time=window,center=True).mean()==1 in xarray.
+
+    Input:
+    ------
+    suitable: numpy.array (time,lat,lon), boolean mask of suitable conditions
+    window:   int, weather window length in days
+
+    Output:
+    -------
+    weather_window: numpy.array (time,lat,lon), 1 if within a weather window, 0 otherwise (float32)
+    '''
+    out = np.zeros(suitable.shape,dtype='float32')
+    if window>suitable.shape[0]:
+        return out
+    csum = np.concatenate([np.zeros((1,)+suitable.shape[1:],dtype='int32'),
+                           np.cumsum(suitable,axis=0,dtype='int32')],axis=0)
+    full = (csum[window:]-csum[:-window])==window
+    out[window//2:window//2+full.shape[0]] = full
+    return out
+
+def _yearly_monthly_sums(var,year_month):
+    '''
+    Sum a variable over each (year,month) group
+
+    Input:
+    ------
+    var:        numpy.array (time,lat,lon)
+    year_month: numpy.array (time), integer group key year*12+month-1
+
+    Output:
+    -------
+    keys:   numpy.array (group), sorted unique group keys
+    sums:   numpy.array (group,lat,lon), sum over each group
+    counts: numpy.array (group), number of time steps in each group
+    '''
+    order = np.argsort(year_month,kind='stable')
+    keys  = year_month[order]
+    if np.any(np.diff(order)!=1):
+        var = var[order]
+    starts = np.flatnonzero(np.r_[True,keys[1:]!=keys[:-1]])
+    sums   = np.add.reduceat(var,starts,axis=0,dtype='float64')
+    counts = np.diff(np.r_[starts,keys.size])
+    return keys[starts], sums, counts
+
+def _monthly_mean(keys,sums,counts,months):
+    '''
+    Monthly mean over all years from (year,month) sums, see _yearly_monthly_sums
+    '''
+    key_months = keys%12+1
+    return np.stack([sums[key_months==month].sum(axis=0)/counts[key_months==month].sum()
+                     for month in months]).astype('float32')
+
+def _compute_tile(datasets,threshold_combination,lat_slice,lon_slice,year_month,months,years,
+                  quantiles,windows,allowed_exceedance,compute_ww,compute_climatology,compute_eclimatology,
+                  idx=None,confidence=[0.05,0.95]):
+    '''
+    Compute all the climatologies of all the threshold combinations over one spatial tile
+
+    Output:
+    -------
+    lat_slice, lon_slice: slices, indices of the tile
+    out: dict, {combination: {(product,suffix): numpy.array}}, where the products are
+         'weather_windows': (windows,month,lat,lon), 'climatology': (month,lat,lon) and
+         'extreme_climatology': (month,quantile,lat,lon) with the suffix ''. If idx is given, also
+         ('extreme_climatology','_quantile_ci'): (month,quantile,confidence,lat,lon) and
+         ('extreme_climatology','_mean_ci'): (month,confidence,lat,lon) are included.
+    '''
+    # read each variable only once per tile, including all its thresholds
+    limits = {}
+    for name in sorted(set(name for combination in threshold_combination.values() for name in combination)):
+        var, limit = name.rsplit('_exceed',1)
+        limits.setdefault(var,[]).append(limit)
+    exceedances = {}
+    for var in limits.keys():
+        for limit,values in _read_tile(datasets,var,limits[var],lat_slice,lon_slice).items():
+            exceedances[var+'_exceed'+limit] = values
+    #
+    out={}
+    for combination in threshold_combination.keys():
+        suitable = _suitable_conditions([exceedances[name] for name in threshold_combination[combination]],
+                                        allowed_exceedance=allowed_exceedance)
+        out[combination]={}
+        if compute_ww:
+            out[combination][('weather_windows','')] = np.stack([_monthly_mean(*_yearly_monthly_sums(_weather_window(suitable,window),year_month),months)
+                                                            for window in windows])
+        if compute_climatology or compute_eclimatology:
+            keys, sums, counts = _yearly_monthly_sums(suitable.astype('float32'),year_month)
+        if compute_climatology:
+            out[combination][('climatology','')] = _monthly_mean(keys,sums,counts,months)
+        if compute_eclimatology:
+            # quantiles of the interannual variability of the monthly means
+            means      = sums/counts[:,None,None]
+            key_months = keys%12+1
+            out[combination][('extreme_climatology','')] = np.stack([np.quantile(means[key_months==month],quantiles,axis=0)
+                                                                     for month in months]).astype('float32')
+            if idx is not None:
+                # bootstrap over the years reusing the monthly means, missing months are NaN
+                grid = np.full((months.size,years.size)+means.shape[1:],np.nan)
+                grid[np.searchsorted(months,key_months),np.searchsorted(years,keys//12)] = means
+                stats = np.moveaxis(_bootstrap_statistics(np.moveaxis(grid,[0,1],[-2,-1]),idx,quantiles,confidence),
+                                    [0,1],[-2,-1])
+                out[combination][('extreme_climatology','_quantile_ci')] = np.moveaxis(stats[:,:,:-1],2,1)
+                out[combination][('extreme_climatology','_mean_ci')]     = stats[:,:,-1]
+    #
+    return lat_slice, lon_slice, out
+
+def _create_output(filename,variables,coords,attrs,tile_size):
+    '''
+    Create an empty netcdf file that the tiles are written to
+
+    Input:
+    ------
+    filename:  str, name of the file (including the path)
+    variables: dict, {name: dims} of the variables to create
+    coords:    dict, {dim: values} of the coordinates
+    attrs:     dict, {dim: attributes} of the coordinates
+    tile_size: dict, {dim: size} used as the chunk size on disk (default 1)
+    '''
+    with netCDF4.Dataset(filename,'w') as nc:
+        for dim in dict.fromkeys(dim for dims in variables.values() for dim in dims):
+            values = np.asarray(coords[dim])
+            nc.createDimension(dim,values.size)
+            cvar = nc.createVariable(dim,values.dtype,(dim,))
+            cvar[:] = values
+            if dim in attrs:
+                cvar.setncatts({key:val for key,val in attrs[dim].items() if key!='_FillValue'})
+        for name,dims in variables.items():
+            chunksizes = [min(tile_size.get(dim,1),np.size(coords[dim])) for dim in dims]
+            nc.createVariable(name,'f4',dims,fill_value=np.nan,chunksizes=chunksizes)
+
+def compute_climatologies_tiled(config,tile_size={'lat':60,'lon':60},quantiles=[0.05,0.5,0.95],windows=[3,5,7],allowed_exceedance=0,
+                                compute_ww=True, compute_climatology=True, compute_eclimatology=True, n_threads=None,
+                                max_tiles_in_flight=None, n_bootstrap=0, confidence=[0.05,0.95], seed=0):
+    '''
+    Compute monthly climatologies tile by tile with numpy and save them to netcdf files.
+    This is a dask-free alternative to compute_climatologies producing the same output files.
+
+    Input:
+    ------
+    config: dict, loaded from the configuration.yml file and including
+            the names of the desired variables under the key {'var_exceed'}
+            and their desired exceedance values, and the 'threshold_combination'
+            to compute. The exceedance files are searched under the 'opa_path' key
+            and the climatological output will be saved under the directory defined
+            by 'data_path' key.
+    tile_size: dict, default is {'lat':60,'lon':60}. Size of the spatial tiles that are read and
+               processed at once. Up to max_tiles_in_flight tiles are in memory, so the memory use is roughly
+               max_tiles_in_flight * number of exceedance variables (incl. thresholds) * time * lat * lon * 4 bytes.
+    quantiles: List or Array (default=[0.05,0.5,0.95]), specifying the quantiles of interannual variability [0-1]
+    windows: list or numpy.array (default=[3,5,7]), weather window lengths in days (int).
+    allowed_exceedance: int (default=0), see compute_climatologies
+    compute_ww:           boolean (default=True), whether or not to compute weather windows
+    compute_climatology:  boolean (default=True), whether or not to compute exceedance climatology
+    compute_eclimatology: boolean (default=True), whether or not to compute the interannual extremes of the exceedance climatology.
+    n_threads: int (default=None), number of threads, if None the number of cpus but at most 4 is used.
+    max_tiles_in_flight: int (default=None), maximum number of tiles computed or waiting to be written
+                         at once, if None 2*n_threads. Bounds the memory use independent of the node size.
+    n_bootstrap, confidence, seed: bootstrap confidence intervals of the extreme and mean climatologies,
+                                   see compute_climatologies. The same seed gives the same resampled years
+                                   as in compute_climatologies.
+
+    Output:
+    -------
+
+    out_names: This function saves monthly statistics to annual files and returns the files paths as a dictionary.
+               The output directory is defined in configuration yml file by the 'data_path' key.
+    '''
+    threshold_combination = config['threshold_combination']
+    years_str = str(config['years'][0])+'_'+str(config['years'][1])
+    if n_threads is None:
+        n_threads = min(4,os.cpu_count() or 1)
+    if max_tiles_in_flight is None:
+        max_tiles_in_flight = 2*n_threads
+    # scan the exceedance files, data is read only tile by tile
+    variables = set(name.rsplit('_exceed',1)[0] for combination in threshold_combination.values() for name in combination)
+    datasets, time, lat, lon = _scan_exceedance_files(config,variables)
+    year_month = (time.dt.year.values*12+time.dt.month.values-1).astype('int64')
+    months     = np.unique(time.dt.month.values)
+    years      = np.unique(time.dt.year.values)
+    idx        = _bootstrap_indices(years.size,n_bootstrap=n_bootstrap,seed=seed) if (compute_eclimatology and n_bootstrap>0) else None
+    coords     = {'month':months,'lat':lat.values,'lon':lon.values,
+                  'windows':np.asarray(windows),'quantile':np.asarray(quantiles,dtype='float64'),
+                  'confidence':np.asarray(confidence,dtype='float64')}
+    attrs      = {'lat':lat.attrs,'lon':lon.attrs}
+    # create the output files
+    # variables of each product as {suffix: dims}
+    products = {}
+    if compute_ww:
+        products['weather_windows'] = {'':('windows','month','lat','lon')}
+    if compute_climatology:
+        products['climatology'] = {'':('month','lat','lon')}
+    if compute_eclimatology:
+        products['extreme_climatology'] = {'':('month','quantile','lat','lon')}
+        if idx is not None:
+            products['extreme_climatology']['_quantile_ci'] = ('month','quantile','confidence','lat','lon')
+            products['extreme_climatology']['_mean_ci']     = ('month','confidence','lat','lon')
+    out_names={}
+    outputs={}
+    for combination in threshold_combination.keys():
+        out_names[combination]=[]
+        outputs[combination]={}
+        for product in products.keys():
+            fname = config['data_path']+combination+'_'+product+'_years_'+years_str+'.nc'
+            _create_output(fname,{combination+suffix:dims for suffix,dims in products[product].items()},
+                           coords,attrs,tile_size)
+            out_names[combination].append(fname)
+            outputs[combination][product] = netCDF4.Dataset(fname,'a')
+    #
+    tiles = [(slice(j,min(j+tile_size['lat'],lat.size)),slice(i,min(i+tile_size['lon'],lon.size)))
+             for j in range(0,lat.size,tile_size['lat']) for i in range(0,lon.size,tile_size['lon'])]
+    print('computing '+str(len(tiles))+' tiles')
+    def write(done):
+        for future in done:
+            lat_slice, lon_slice, out = future.result()
+            for combination in out.keys():
+                for (product,suffix),values in out[combination].items():
+                    with _NETCDF_LOCK:
+                        outputs[combination][product][combination+suffix][...,lat_slice,lon_slice] = values
+    # keep only a limited number of tiles in flight to bound the memory use,
+    # all netCDF reads and writes share the same lock
+    try:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            pending = set()
+            for lat_slice,lon_slice in tiles:
+                pending.add(pool.submit(_compute_tile,datasets,threshold_combination,lat_slice,lon_slice,year_month,months,years,
+                                        quantiles,windows,allowed_exceedance,compute_ww,compute_climatology,compute_eclimatology,
+                                        idx=idx,confidence=confidence))
+                if len(pending)>=max_tiles_in_flight:
+                    done, pending = wait(pending,return_when=FIRST_COMPLETED)
+                    write(done)
+            done, pending = wait(pending)
+            write(done)
+    finally:
+        for combination in outputs.keys():
+            for nc in outputs[combination].values():
+                nc.close()
+    #
+    return out_names
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+#
+#Destination Earth: Energy Offshore application - gridded verification
+#Author: Aleksi Nummelin, Andrew Twelves, Jonni Lehtiranta
+#Version: 0.3.0
+
+### --- Libraries --- ###
+import numpy as np
+import xarray as xr
+from scipy import sparse
+import os
+import tempfile
+import shutil
+
+def _cell_bounds(centers):
+    '''
+    Estimate cell bounds from cell centers of a 1D coordinate. Inner bounds
+    are the midpoints between the centers and the outer bounds are extrapolated.
+
+    Input:
+    ------
+    centers: 1D array of cell centers (at least 2 values)
+
+    Output:
+    -------
+    bounds: 1D numpy.array of size centers.size+1
+    '''
+    centers = np.asarray(centers,dtype='float64')
+    mid     = 0.5*(centers[1:]+centers[:-1])
+    return np.concatenate([[2*centers[0]-mid[0]],mid,[2*centers[-1]-mid[-1]]])
+
+def _overlap_1d(src_bounds,dst_bounds):
+    '''
+    Overlap length between every destination and source interval.
+
+    Input:
+    ------
+    src_bounds: 1D numpy.array, source cell bounds (n_src+1)
+    dst_bounds: 1D numpy.array, destination cell bounds (n_dst+1)
+
+    Output:
+    -------
+    overlap: numpy.array (n_dst,n_src), length of the overlap (0 where the cells do not overlap)
+    '''
+    s0 = np.minimum(src_bounds[:-1],src_bounds[1:])
+    s1 = np.maximum(src_bounds[:-1],src_bounds[1:])
+    d0 = np.minimum(dst_bounds[:-1],dst_bounds[1:])
+    d1 = np.maximum(dst_bounds[:-1],dst_bounds[1:])
+    return np.clip(np.minimum(d1[:,None],s1[None,:])-np.maximum(d0[:,None],s0[None,:]),0,None)
+
+def compute_regridding_weights(src_lat,src_lon,dst_lat,dst_lon):
+    '''
+    Compute first order conservative regridding weights between two
+    regular lat-lon grids. Both grids need to use the same longitude
+    convention (e.g. -180-180), see _match_longitudes.
+
+    On a regular lat-lon grid the area of a cell is proportional to
+    d(sin(lat))*d(lon), so the overlap areas factorize to a product of
+    1D overlaps in latitude and longitude, i.e. the full weight matrix
+    is the kronecker product of the two 1D overlap matrices.
+
+    Input:
+    ------
+    src_lat, src_lon: 1D arrays, cell centers of the source grid
+    dst_lat, dst_lon: 1D arrays, cell centers of the destination grid
+
+    Output:
+    -------
+    weights: scipy.sparse.csr_matrix (dst_lat.size*dst_lon.size, src_lat.size*src_lon.size),
+             fraction of each destination cell covered by each source cell. Grids are
+             flattened in (lat,lon) order.
+    '''
+    src_sinlat = np.sin(np.radians(np.clip(_cell_bounds(src_lat),-90,90)))
+    dst_sinlat = np.sin(np.radians(np.clip(_cell_bounds(dst_lat),-90,90)))
+    src_lon_b  = _cell_bounds(src_lon)
+    dst_lon_b  = _cell_bounds(dst_lon)
+    if max(src_lon_b.min(),dst_lon_b.min())>=min(src_lon_b.max(),dst_lon_b.max()):
+        raise ValueError('longitudes of the source and destination grids do not overlap, '
+                         'check the longitude convention (0-360 vs -180-180)')
+    #
+    overlap  = sparse.kron(sparse.csr_matrix(_overlap_1d(src_sinlat,dst_sinlat)),
+                           sparse.csr_matrix(_overlap_1d(src_lon_b,dst_lon_b)),format='csr')
+    dst_area = np.outer(np.abs(np.diff(dst_sinlat)),np.abs(np.diff(dst_lon_b))).ravel()
+    #
+    return sparse.diags(1/dst_area).dot(overlap).tocsr()
+
+def load_regridding_weights(src,dst,weights_file):
+    '''
+    Load conservative regridding weights from a cache file or compute
+    and save them if the file does not exist yet.
+
+    Input:
+    ------
+    src:          xr.DataArray or xr.Dataset with 'lat' and 'lon' coordinates, source grid
+    dst:          xr.DataArray or xr.Dataset with 'lat' and 'lon' coordinates, destination grid
+    weights_file: str, netcdf file (including the path) in which the weights are cached
+
+    Output:
+    -------
+    weights: scipy.sparse.csr_matrix (n_dst,n_src), see compute_regridding_weights
+    '''
+    n_src = src.lat.size*src.lon.size
+    n_dst = dst.lat.size*dst.lon.size
+    # cell bounds of both grids are stored with the weights to detect a stale cache
+    bounds = {'src_lat_b':_cell_bounds(src.lat.values),'src_lon_b':_cell_bounds(src.lon.values),
+              'dst_lat_b':_cell_bounds(dst.lat.values),'dst_lon_b':_cell_bounds(dst.lon.values)}
+    if os.path.isfile(weights_file):
+        with xr.open_dataset(weights_file) as ds:
+            for key in bounds.keys():
+                if ds[key].size!=bounds[key].size or not np.allclose(ds[key].values,bounds[key]):
+                    raise ValueError('regridding weights in '+weights_file+' do not match the given grids, '
+                                     'remove the file to recompute the weights')
+            weights = sparse.csr_matrix((ds.S.values,(ds.row.values,ds.col.values)),shape=(n_dst,n_src))
+    else:
+        print('computing regridding weights '+weights_file)
+        weights = compute_regridding_weights(src.lat.values,src.lon.values,dst.lat.values,dst.lon.values)
+        coo     = weights.tocoo()
+        ds      = xr.Dataset({'S':('n_s',coo.data),'row':('n_s',coo.row),'col':('n_s',coo.col)},
+                             attrs={'n_src':n_src,'n_dst':n_dst,'method':'conservative'})
+        for key in bounds.keys():
+            ds[key] = (key,bounds[key])
+        ds.to_netcdf(weights_file)
+    #
+    return weights
+
+def _match_longitudes(var,grid):
+    '''
+    Convert the longitudes of var to the longitude convention of grid
+    (e.g. 0-360 to -180-180) and sort them in increasing order.
+
+    Input:
+    ------
+    var:  xr.DataArray (...,lat,lon)
+    grid: xr.DataArray or xr.Dataset with 'lon' coordinate
+
+    Output:
+    -------
+    var: xr.DataArray (...,lat,lon), with longitudes within 180 degrees of the center of grid
+    '''
+    center = 0.5*(float(grid.lon.min())+float(grid.lon.max()))
+    lon    = (var.lon-center+180)%360-180+center
+    if np.allclose(lon,var.lon):
+        return var
+    return var.assign_coords({'lon':lon}).sortby('lon')
+
+def regrid(var,weights,lat,lon):
+    '''
+    Apply precomputed regridding weights as a sparse matrix product.
+    Missing values (e.g. land) in the source are excluded and the
+    remaining overlapping cells are renormalized.
+
+    Input:
+    ------
+    var:     xr.DataArray (...,lat,lon), field on the source grid
+    weights: scipy.sparse.csr_matrix (n_dst,n_src), see load_regridding_weights
+    lat:     1D array or xr.DataArray, destination grid latitudes
+    lon:     1D array or xr.DataArray, destination grid longitudes
+
+    Output:
+    -------
+    var_out: xr.DataArray (...,lat,lon), field on the destination grid. Destination cells
+             without any valid source data are set to NaN.
+    '''
+    src       = var.transpose(...,'lat','lon')
+    lead_dims = src.dims[:-2]
+    values    = src.values.reshape(-1,src.lat.size*src.lon.size).T
+    valid     = np.isfinite(values)
+    num       = weights.dot(np.where(valid,values,0))
+    den       = weights.dot(valid.astype(num.dtype))
+    out       = np.where(den>0,num/np.where(den>0,den,1),np.nan)
+    out       = out.T.reshape(src.shape[:-2]+(np.size(lat),np.size(lon)))
+    coords    = {dim:src[dim].values for dim in lead_dims if dim in src.coords}
+    coords.update({'lat':np.asarray(lat),'lon':np.asarray(lon)})
+    #
+    return xr.DataArray(out,dims=lead_dims+('lat','lon'),coords=coords,name=var.name,attrs=var.attrs)
+
+def compute_verification_statistics(model,reference):
+    '''
+    Compute gridded and area averaged verification statistics of a model
+    climatology against a reference climatology on the same grid.
+
+    Input:
+    ------
+    model:     xr.DataArray (month,[quantile],lat,lon), model climatology
+    reference: xr.DataArray (month,[quantile],lat,lon), reference (e.g. CERRA) climatology
+
+    Output:
+    -------
+    maps:  xr.Dataset, gridded statistics
+           bias (month,[quantile],lat,lon):  model - reference
+           rmse ([quantile],lat,lon):        root mean square difference over the months
+           skill ([quantile],lat,lon):       mean square error skill score (1-MSE/MSE_clim) where
+                                             the reference forecast is the annual mean of the reference
+    table: xr.Dataset (month,[quantile]), cos(lat) weighted area statistics
+           bias:        area mean bias
+           rmse:        area root mean square difference
+           correlation: spatial pattern correlation
+           skill:       1-MSE/var(reference), where var is the spatial variance of the reference
+    '''
+    model, reference = xr.align(model,reference,join='inner')
+    diff      = model-reference
+    valid     = diff.notnull()
+    model     = model.where(valid)
+    reference = reference.where(valid)
+    # gridded maps
+    mse       = (diff**2).mean('month')
+    mse_clim  = ((reference-reference.mean('month'))**2).mean('month')
+    maps = xr.Dataset({'bias':diff,
+                       'rmse':np.sqrt(mse),
+                       'skill':1-mse/mse_clim.where(mse_clim>0),
+                       'model':model,
+                       'reference':reference})
+    # area weighted tables, weight by cos latitude
+    w      = np.cos(np.radians(reference.lat))
+    dims   = ('lat','lon')
+    mmean  = model.weighted(w).mean(dims)
+    rmean  = reference.weighted(w).mean(dims)
+    cov    = ((model-mmean)*(reference-rmean)).weighted(w).mean(dims)
+    mvar   = ((model-mmean)**2).weighted(w).mean(dims)
+    rvar   = ((reference-rmean)**2).weighted(w).mean(dims)
+    amse   = (diff**2).weighted(w).mean(dims)
+    table  = xr.Dataset({'bias':diff.weighted(w).mean(dims),
+                         'rmse':np.sqrt(amse),
+                         'correlation':cov/np.sqrt(mvar*rvar).where(mvar*rvar>0),
+                         'skill':1-amse/rvar.where(rvar>0)})
+    #
+    return maps, table
+
+def _grid_name(grid):
+    '''
+    Short description of a lat-lon grid (size and extent) used in the names of the weight files
+    '''
+    return (str(grid.lat.size)+'x'+str(grid.lon.size)+'_'+
+            '{:.2f}_{:.2f}_{:.2f}_{:.2f}'.format(float(grid.lat[0]),float(grid.lat[-1]),
+                                                 float(grid.lon[0]),float(grid.lon[-1])))
+
+def verify_climatologies(model,reference,weights_path,grid=None):
+    '''
+    Regrid model and reference climatologies conservatively to a common
+    grid and compute verification statistics. Regridding weights are
+    cached under weights_path and reused on subsequent calls.
+
+    Input:
+    ------
+    model:        xr.DataArray (month,[quantile],lat,lon), model climatology
+    reference:    xr.DataArray (month,[quantile],lat,lon), reference (e.g. CERRA) climatology
+    weights_path: str, directory in which the regridding weights are cached
+    grid:         xr.DataArray or xr.Dataset with 'lat' and 'lon' coordinates (default=None),
+                  common grid of the verification. If None the model grid is used.
+
+    Output:
+    -------
+    maps, table: xr.Datasets, see compute_verification_statistics
+    '''
+    if grid is None:
+        grid = model
+    #
+    regridded = []
+    for var in [model,reference]:
+        var = _match_longitudes(var,grid)
+        if var.lat.equals(grid.lat) and var.lon.equals(grid.lon):
+            regridded.append(var)
+        else:
+            weights_file = os.path.join(weights_path,'conservative_weights_'+_grid_name(var)+'_to_'+_grid_name(grid)+'.nc')
+            weights = load_regridding_weights(var,grid,weights_file)
+            regridded.append(regrid(var,weights,grid.lat,grid.lon))
+    #
+    return compute_verification_statistics(regridded[0],regridded[1])
+
+def test():
+    '''
+    Test the regridding and the verification statistics with dummy data
+    '''
+    # fine grid nested in a coarse grid (4x4 fine cells per coarse cell)
+    fine   = xr.Dataset(coords={'lat':np.arange(50.125,60,0.25),'lon':np.arange(0.125,10,0.25)})
+    coarse = xr.Dataset(coords={'lat':np.arange(50.5,60,1.0),'lon':np.arange(0.5,10,1.0)})
+    def area(grid):
+        sinlat = np.sin(np.radians(_cell_bounds(grid.lat.values)))
+        return np.outer(np.diff(sinlat),np.diff(_cell_bounds(grid.lon.values)))
+    weights = compute_regridding_weights(fine.lat.values,fine.lon.values,coarse.lat.values,coarse.lon.values)
+    #
+    print('Checking regridding...')
+    # constant field stays constant
+    const = xr.DataArray(np.full((fine.lat.size,fine.lon.size),0.3),dims=('lat','lon'),coords=fine.coords)
+    np.testing.assert_allclose(regrid(const,weights,coarse.lat,coarse.lon).values,0.3)
+    print('constant field as expected')
+    # the same grid gives the identity
+    identity = compute_regridding_weights(fine.lat.values,fine.lon.values,fine.lat.values,fine.lon.values)
+    np.testing.assert_allclose(identity.toarray(),np.eye(fine.lat.size*fine.lon.size),atol=1E-12)
+    print('identity as expected')
+    # the area weighted integral is conserved
+    rng   = np.random.default_rng(0)
+    field = xr.DataArray(rng.random((12,fine.lat.size,fine.lon.size)),dims=('month','lat','lon'),
+                         coords={'month':np.arange(1,13),'lat':fine.lat,'lon':fine.lon})
+    out   = regrid(field,weights,coarse.lat,coarse.lon)
+    np.testing.assert_allclose((out.values*area(coarse)).sum(axis=(1,2)),(field.values*area(fine)).sum(axis=(1,2)))
+    print('conservation as expected')
+    # 0-360 longitudes are converted to the -180-180 convention
+    shifted = field.assign_coords({'lon':field.lon%360-5})
+    np.testing.assert_allclose(_match_longitudes(shifted.assign_coords({'lon':shifted.lon%360}),shifted).values,shifted.values)
+    print('longitude conversion as expected')
+    #
+    print('Checking weight cache...')
+    weights_path = tempfile.mkdtemp()
+    weights_file = os.path.join(weights_path,'weights.nc')
+    try:
+        cached = load_regridding_weights(fine,coarse,weights_file)
+        loaded = load_regridding_weights(fine,coarse,weights_file)
+        np.testing.assert_allclose(loaded.toarray(),cached.toarray())
+        # same size and origin, but a different spacing
+        other = xr.Dataset(coords={'lat':np.arange(50.5,55,0.5),'lon':np.arange(0.5,5,0.5)})
+        try:
+            load_regridding_weights(fine,other,weights_file)
+        except ValueError:
+            print('weight cache as expected')
+        else:
+            raise AssertionError('stale regridding weights were not detected')
+        #
+        print('Checking verification statistics...')
+        maps, table = verify_climatologies(field,field,weights_path)
+        np.testing.assert_allclose(maps.bias.values,0)
+        np.testing.assert_allclose(maps.rmse.values,0)
+        np.testing.assert_allclose(maps.skill.values,1)
+        np.testing.assert_allclose(table.bias.values,0)
+        np.testing.assert_allclose(table.rmse.values,0)
+        np.testing.assert_allclose(table.skill.values,1)
+        # the coarse reference is regridded to the model grid with cached weights
+        maps, table = verify_climatologies(out,field,weights_path)
+        assert maps.bias.shape==(12,coarse.lat.size,coarse.lon.size), 'non-expected shape of the bias'
+        np.testing.assert_allclose(maps.bias.values,0,atol=1E-12)
+        print('verification statistics as expected')
+    finally:
+        shutil.rmtree(weights_path)
@@ -8,18 +8,13 @@
 import numpy as np
 import xarray as xr
 import glob
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import matplotlib.path as mpath
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-from matplotlib.colors import from_levels_and_colors
 import yaml
 from dask.distributed import Client, LocalCluster, progress
 import os
 import socket
 from EnergyOffshore import EnergyOffshore_analysis_and_visualization as EO
+from EnergyOffshore import verification as EOV
+from EnergyOffshore import tiled as EOT
 
 if __name__ == '__main__':
     '''EXECUTE ENERGY OFFSHORE -- STATISTICS IN SUPPORT OF SITING'''
@@ -29,8 +24,8 @@ if __name__ == '__main__':
     threshold_combination = config['threshold_combination']
     years_str = str(config['years'][0])+'_'+str(config['years'][1])
     #
-    # create a dask cluster if desired
-    if config['use_dask']:
+    # create a dask cluster if desired, the numpy engine does not use dask
+    if config['use_dask'] and config.get('engine','dask')!='numpy':
         local_dir = config['dask']['dask_path']+socket.gethostname()+'/'
         if not os.path.isdir(local_dir):
             os.system('mkdir -p '+local_dir)
@@ -45,13 +40,22 @@ if __name__ == '__main__':
         client  = Client(cluster)
     
     ############################
-    # LOAD EXCEEDANCE DATA
-    # 
-    data=EO.load_data(config)
-    #
     # COMPUTE MONTHLY CLIMATOLOGIES IF NEEDED
     if config['compute_climatologies']:
-        EO.compute_climatologies(data,config)
+        # bootstrap confidence intervals of the extreme climatology (n_bootstrap: 0 to skip)
+        bootstrap = config.get('bootstrap',{'n_bootstrap':0,'confidence':[0.05,0.95],'seed':0})
+        if config.get('engine','dask')=='numpy':
+            # tiled numpy engine, reads the exceedance files directly
+            EOT.compute_climatologies_tiled(config,tile_size=config['tiled']['tile_size'],
+                                            n_threads=config['tiled']['n_threads'],
+                                            max_tiles_in_flight=config['tiled'].get('max_tiles_in_flight'),
+                                            n_bootstrap=bootstrap['n_bootstrap'],confidence=bootstrap['confidence'],
+                                            seed=bootstrap['seed'])
+        else:
+            # LOAD EXCEEDANCE DATA
+            data=EO.load_data(config)
+            EO.compute_climatologies(data,config,n_bootstrap=bootstrap['n_bootstrap'],
+                                     confidence=bootstrap['confidence'],seed=bootstrap['seed'])
     
     # LOAD ALL CLIMATOLOGIES FOR PLOTTING
     if config['visualize'] or config['verify']:
@@ -88,8 +92,20 @@ if __name__ == '__main__':
         EO.verify_climatology_at_location(verification_climatologies,verification_extreme_climatologies,
                                        config['verification_areas'],
                                        plot_name=config['plot_path']+'DT_climate_verify_point_climatologies_with_CERRA_'+years_str+'.png')
+        # GRIDDED VERIFICATION OVER THE FULL DOMAIN
+        if config.get('verify_gridded',False):
+            for key in config['verification_variables']:
+                for clim,clim_dict in zip(['climatology','extreme_climatology'],
+                                          [verification_climatologies,verification_extreme_climatologies]):
+                    print('verify '+clim+' '+key)
+                    maps, table = EOV.verify_climatologies(clim_dict['IFS_'+key],clim_dict['CERRA_'+key],
+                                                           config['data_path'])
+                    maps.to_netcdf(config['data_path']+'DT_climate_verify_gridded_'+clim+'_'+key+'_with_CERRA_'+years_str+'.nc')
+                    table.to_dataframe().to_csv(config['data_path']+'DT_climate_verify_table_'+clim+'_'+key+'_with_CERRA_'+years_str+'.csv')
     # VISUALIZE DATA ON A MAP AND TIMESERIES
     if config['visualize']:
+        # plotting dependencies are only needed here
+        import cartopy.crs as ccrs
         # PLOT A MAP
         central_longitude = sum(config['map']['region'][:2])/2
         central_latitude  = sum(config['map']['region'][2:])/2
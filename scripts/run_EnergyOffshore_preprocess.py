@@ -16,7 +16,7 @@ import yaml
 from dask.distributed import Client, LocalCluster, progress
 import os
 import socket
-from EnergyOffshore import EnergyOffshore_analysis_and_visualization as EO
+from EnergyOffshore import compute as EO
 
 if __name__ == '__main__':
     # read a config file with paths